@@ -4,87 +4,377 @@ Minimal PTY wrapper for Claude Code
 """
 
 import os
+import re
 import sys
 import pty
-import select
+import selectors
+import signal
 import tty
 import termios
 import argparse
+import errno
 import struct
 import fcntl
+import functools
 import time
 
 
-def generate_suggestion(text):
-    """Generate a mock autocomplete suggestion."""
-    suggestions = {
-        "write": " a function to calculate fibonacci",
-        "create": " a new Python class",
-        "help": " me understand this code",
-        "fix": " the bug in this function",
-        "explain": " how this works",
-        "show": " me an example"
-    }
-
-    # Find the last word
-    words = text.strip().split()
-    if not words:
-        return ""
-
-    last_word = words[-1].lower()
-    return suggestions.get(last_word, "")
-
-
-def get_terminal_size():
-    """Get current terminal size."""
+# Input byte classes - a read is mapped to class codes with one bytes.translate
+IGNORE, PRINTABLE, ENTER, BACKSPACE, CTRL_C, TAB = range(6)
+CONTROL_CLASSES = {13: ENTER, 127: BACKSPACE, 3: CTRL_C, 9: TAB}
+INPUT_CLASSES = bytes(
+    PRINTABLE if 32 <= b <= 126 else CONTROL_CLASSES.get(b, IGNORE) for b in range(256)
+)
+
+# Finds the control keys the input tracker reacts to in translated input
+CONTROL_CODES = re.compile(b"[%c-%c]" % (ENTER, TAB))
+
+# Everything outside printable ASCII, stripped from typed text in one pass
+NON_PRINTABLE = bytes(b for b in range(256) if INPUT_CLASSES[b] != PRINTABLE)
+
+
+def sgr(*params):
+    """Build a single SGR escape sequence from its parameters."""
+    return b"\033[" + ";".join(map(str, params)).encode() + b"m"
+
+
+# Status line styles - white on gray segments, gray-on-black powerline separator.
+# The separator leaves the background black, so the fill after it needs no SGR
+# of its own and a single reset at end-of-line is enough.
+SGR_SUGGEST = sgr(37, 48, 5, 240)
+SGR_SEP = sgr(38, 5, 240, 40)
+SGR_RESET = b"\033[0m"
+
+# Pre-encoded status segment pieces
+SUGGEST_START = SGR_SUGGEST + " 💡 ".encode()
+DEBUG_START = SGR_SUGGEST + " 🐛 ".encode()
+SEGMENT_END = b" " + SGR_SEP + "⮀".encode()
+
+# Status frames save Claude's cursor position FIRST and restore it at the end
+SAVE_CURSOR = b"\033[s"
+RESTORE_CURSOR = b"\033[u"
+
+# Minimum seconds between status repaints (~60 Hz)
+REPAINT_INTERVAL = 0.016
+
+# How long Claude gets to exit after each hangup signal before the next one
+HANGUP_GRACE = 1.0
+
+
+# Mock autocomplete suggestions, keyed by the (lowercased) last word typed
+# (all bytes: typed input is matched and suggestions injected without decoding)
+SUGGESTIONS = {
+    b"write": b" a function to calculate fibonacci",
+    b"create": b" a new Python class",
+    b"help": b" me understand this code",
+    b"fix": b" the bug in this function",
+    b"explain": b" how this works",
+    b"show": b" me an example"
+}
+
+
+def last_word(text):
+    """Return the lowercased word being typed at the end of text (b"" after a space)."""
+    return bytes(text.rpartition(b" ")[2].lower())
+
+
+class InputTracker:
+    """Track the message being typed in Claude's prompt and its suggestion."""
+
+    def __init__(self, debug=False):
+        self.message = bytearray()
+        self.current_word = b""
+        self.suggestion = b""
+        self.debug_info = ""
+        self._to_claude = []
+        self._dirty = False
+        # Bound once so the default (non-debug) path never formats debug text
+        self._emit_debug = self._record_debug_info if debug else (lambda template: None)
+        self._handlers = {
+            ENTER: self._on_enter,
+            BACKSPACE: self._on_backspace,
+            CTRL_C: self._on_ctrl_c,
+            TAB: self._on_tab,
+        }
+
+    def feed(self, data):
+        """Track one stdin read; return (bytes to send to Claude, status changed)."""
+        self._to_claude.clear()
+        self._dirty = False
+
+        # Track input between control bytes, found via their byte classes
+        classes = data.translate(INPUT_CLASSES)
+        start = 0
+        for match in CONTROL_CODES.finditer(classes):
+            pos = match.start()
+            if pos > start:
+                self._on_text(data[start:pos])
+            self._handlers[classes[pos]]()
+            start = pos + 1
+        if start < len(data):
+            self._on_text(data[start:])
+
+        # Forward the data to Claude (unless it was Tab)
+        if data != b"\t":
+            self._to_claude.append(data)
+        return b"".join(self._to_claude), self._dirty
+
+    def message_text(self):
+        """Decode the tracked message - only needed for debug output."""
+        return self.message.decode("ascii", "replace")
+
+    def _record_debug_info(self, template):
+        """Format debug info for the status line ({message} and {suggestion} fields)."""
+        self.debug_info = template.format(
+            message=self.message_text(), suggestion=self.suggestion.decode()
+        )
+
+    def _on_text(self, run):
+        """Append a run of typed bytes, keeping only printable ASCII."""
+        text = run.translate(None, NON_PRINTABLE)
+        if not text:
+            return
+        self.message.extend(text)
+        # Only the word under the cursor matters for the suggestion
+        if b" " in text:
+            self.current_word = last_word(text)
+        else:
+            self.current_word += text.lower()
+        self.suggestion = SUGGESTIONS.get(self.current_word, b"")
+        self._emit_debug("Current: '{message}' | Suggestion: '{suggestion}'")
+        self._dirty = True
+
+    def _on_enter(self):
+        """Enter key (carriage return) - message sent."""
+        self._emit_debug("Message sent: '{message}'")
+        self.message.clear()
+        self.current_word = b""
+        self.suggestion = b""
+        self._dirty = True
+
+    def _on_backspace(self):
+        """Backspace - drop the last character."""
+        if self.message:
+            del self.message[-1:]
+            self.current_word = last_word(self.message)
+        # Clear old suggestion since user is editing
+        self.suggestion = b""
+        self._emit_debug("Current: '{message}' (suggestion voided)")
+        self._dirty = True
+
+    def _on_ctrl_c(self):
+        """Ctrl+C - discard the current message."""
+        self._emit_debug("Ctrl+C pressed")
+        self.message.clear()
+        self.current_word = b""
+        self.suggestion = b""
+        self._dirty = True
+
+    def _on_tab(self):
+        """Tab key - accept suggestion."""
+        if self.suggestion:
+            # Inject suggestion as real keystrokes
+            self._to_claude.append(self.suggestion)
+            self.message.extend(self.suggestion)
+            self.current_word = last_word(self.message)
+            self._emit_debug("Accepted suggestion, new text: '{message}'")
+            self.suggestion = b""
+            self._dirty = True
+
+
+# Cached (rows, cols), refreshed on startup and on SIGWINCH only
+_term_size = [24, 80]
+
+
+def refresh_terminal_size():
+    """Query the terminal size and store it in the cache."""
     try:
         size = struct.unpack('hh', fcntl.ioctl(sys.stdout.fileno(), termios.TIOCGWINSZ, '1234'))
-        return size[0], size[1]  # rows, cols
-    except:
-        return 24, 80  # Default fallback
+        _term_size[0], _term_size[1] = size[0], size[1]  # rows, cols
+    except OSError:
+        pass  # Keep the previous size (24x80 by default)
 
 
-def update_status_line(suggestion="", debug_info=""):
-    """Update the status line with simple powerline styling."""
-    rows, cols = get_terminal_size()
-
-    # Save Claude's cursor position FIRST
-    sys.stdout.write("\033[s")
-
-    # Simple powerline colors - white on gray
-    status_content = ""
+def get_terminal_size():
+    """Get current terminal size."""
+    return _term_size[0], _term_size[1]
+
+
+@functools.lru_cache(maxsize=64)
+def suggestion_segment(suggestion, cols):
+    """Assemble the non-debug status line content for a suggestion (bytes)."""
+    if not suggestion:
+        return b""
+    # Fill rest with black (rough visible length estimate)
+    fill = b" " * max(0, cols - len(suggestion) - 10)
+    return SUGGEST_START + suggestion + SEGMENT_END + fill + SGR_RESET
+
+
+def make_painter(debug, rows, cols):
+    """Build a paint(suggestion, debug_info, force) for the debug mode and terminal size."""
+    fd = sys.stdout.fileno()
+    # Move to the status line and clear it
+    position = b"\033[%d;1H\033[K" % rows
+
+    if not debug:
+        last_suggestion = None
+
+        def paint(suggestion, debug_info="", force=False):
+            nonlocal last_suggestion
+            if suggestion == last_suggestion and not force:
+                return
+            last_suggestion = suggestion
+            segment = suggestion_segment(suggestion, cols)
+            write_all(fd, [SAVE_CURSOR, position, segment, RESTORE_CURSOR])
+
+        return paint
+
+    # Reused across repaints so building a frame doesn't allocate a new buffer
+    frame_buf = bytearray()
+    last_key = None
+
+    def paint(suggestion, debug_info="", force=False):
+        nonlocal last_key
+        key = (suggestion, debug_info)
+        if key == last_key and not force:
+            return
+        last_key = key
+        frame = frame_buf
+        frame.clear()
+
+        # Simple powerline colors - white on gray
+        if suggestion:
+            frame += SUGGEST_START
+            frame += suggestion
+            frame += SEGMENT_END
+
+        if debug_info:
+            debug_short = debug_info[:50] + "..." if len(debug_info) > 50 else debug_info
+            frame += DEBUG_START
+            frame += debug_short.encode()
+            frame += SEGMENT_END
+
+        # Fill rest with black
+        if suggestion or debug_info:
+            # Estimate visible length (rough)
+            visible_len = len(suggestion) + len(debug_info[:50]) + 10
+            frame += b" " * max(0, cols - visible_len)
+            frame += SGR_RESET
+
+        write_all(fd, [SAVE_CURSOR, position, frame, RESTORE_CURSOR])
+
+    return paint
+
+
+class RepaintScheduler:
+    """Rate-limit status repaints to REPAINT_INTERVAL, deferring any that come too soon."""
+
+    def __init__(self, paint, clock=time.monotonic):
+        self.paint = paint  # Called as paint(force)
+        self.clock = clock
+        self.last_repaint = 0.0
+        self.pending = False
+        self.clobbered = False
+
+    def request(self, clobbered=False):
+        """Repaint the status line now, or defer it if we painted too recently."""
+        # Claude's output may have drawn over the status line - redraw even if unchanged
+        self.clobbered = self.clobbered or clobbered
+        now = self.clock()
+        if now - self.last_repaint >= REPAINT_INTERVAL:
+            self.paint(self.clobbered)
+            self.last_repaint = now
+            self.pending = False
+            self.clobbered = False
+        else:
+            self.pending = True
 
-    if suggestion:
-        status_content = f"\033[37;48;5;240m 💡 {suggestion} \033[48;5;240;38;5;240m\033[40m⮀\033[0m"
+    def timeout(self):
+        """Seconds until a deferred repaint is due, or None if none is pending."""
+        if not self.pending:
+            return None
+        return max(0.0, self.last_repaint + REPAINT_INTERVAL - self.clock())
 
-    if debug_info:
-        debug_short = debug_info[:50] + "..." if len(debug_info) > 50 else debug_info
-        if status_content:
-            status_content += f"\033[37;48;5;240m 🐛 {debug_short} \033[48;5;240;38;5;240m\033[40m⮀\033[0m"
-        else:
-            status_content = f"\033[37;48;5;240m 🐛 {debug_short} \033[48;5;240;38;5;240m\033[40m⮀\033[0m"
 
-    # Fill rest with black
-    if status_content:
-        # Estimate visible length (rough)
-        visible_len = len(suggestion) + len(debug_info[:50]) + 10
-        remaining = max(0, cols - visible_len)
-        status_content += "\033[40m" + " " * remaining + "\033[0m"
+# Most chunks drained per wakeup - keeps writev well under IOV_MAX and lets
+# stdin get serviced between drains of a fast producer
+MAX_DRAIN_CHUNKS = 16
 
-    # Position and render
-    status_row = rows
-    sys.stdout.write(f"\033[{status_row};1H")  # Move to status line
-    sys.stdout.write("\033[K")  # Clear line
-    if status_content:
-        sys.stdout.write(status_content)
 
-    # CRITICAL: Restore Claude's cursor position
-    sys.stdout.write("\033[u")
-    sys.stdout.flush()
+def read_available(fd, size=131072, max_chunks=MAX_DRAIN_CHUNKS):
+    """Drain a non-blocking fd, returning the chunks read (empty list on EOF)."""
+    chunks = []
+    try:
+        while len(chunks) < max_chunks:
+            chunk = os.read(fd, size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except BlockingIOError:
+        pass  # Nothing more to read for now
+    except OSError:
+        # EIO once the child has exited - hand back what we already have first
+        if not chunks:
+            raise
+    return chunks
+
+
+def write_all(fd, buffers):
+    """writev buffers to a blocking fd, resuming after short writes."""
+    buffers = list(buffers)
+    while buffers:
+        written = os.writev(fd, buffers)
+        # Drop what went out; a partially written buffer is resumed mid-way
+        while buffers and written >= len(buffers[0]):
+            written -= len(buffers.pop(0))
+        if written:
+            buffers[0] = memoryview(buffers[0])[written:]
+
+
+def write_pending(fd, pending):
+    """Write as much of a bytearray as a non-blocking fd accepts; True once it's empty."""
+    try:
+        while pending:
+            written = os.write(fd, pending)
+            del pending[:written]
+    except BlockingIOError:
+        pass  # Claude isn't reading right now - keep the rest queued
+    return not pending
 
 
-def setup_terminal_with_status(debug=False):
-    """Set up terminal with tmux-style persistent status bar."""
+def open_selector(stdin_fd):
+    """Create the event loop selector with stdin already registered."""
+    sel = selectors.DefaultSelector()
+    try:
+        sel.register(stdin_fd, selectors.EVENT_READ, "in")
+    except PermissionError:
+        # epoll refuses regular files and /dev/null; select() reports them readable
+        sel.close()
+        sel = selectors.SelectSelector()
+        sel.register(stdin_fd, selectors.EVENT_READ, "in")
+    return sel
+
+
+def hang_up_child(pid, grace=HANGUP_GRACE):
+    """Hang up the child like a closed terminal would, escalating only if it stays."""
+    for sig in (signal.SIGHUP, signal.SIGTERM):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            break  # Already gone, just reap it
+        deadline = time.monotonic() + grace
+        while time.monotonic() < deadline:
+            reaped, status = os.waitpid(pid, os.WNOHANG)
+            if reaped:
+                return status
+            time.sleep(0.01)
+    else:
+        os.kill(pid, signal.SIGKILL)
+    return os.waitpid(pid, 0)[1]
+
+
+def setup_terminal_with_status(debug=False, banner=b""):
+    """Set up terminal with tmux-style persistent status bar, then show banner."""
     rows, cols = get_terminal_size()
 
     # Reserve bottom lines for our status
@@ -92,38 +382,45 @@ def setup_terminal_with_status(debug=False):
     claude_rows = rows - status_lines
 
     # Set scrolling region for Claude (top area only) - this is CRITICAL
-    sys.stdout.write(f"\033[1;{claude_rows}r")  # Set scrolling region
+    frame = b"\033[1;%dr" % claude_rows
 
     # Clear only Claude's region, not our status area
-    sys.stdout.write(f"\033[1;1H")  # Move to top of Claude's region
-    sys.stdout.write(f"\033[0J")    # Clear from cursor to end of Claude's region
+    frame += b"\033[1;1H"  # Move to top of Claude's region
+    frame += b"\033[0J"    # Clear from cursor to end of Claude's region
 
-    # Initialize status bar area with background
+    # Initialize status bar area - first line gets a subtle dark gray background
     status_row = rows - status_lines + 1
-    for i in range(status_lines):
-        sys.stdout.write(f"\033[{status_row + i};1H")
-        sys.stdout.write("\033[K")  # Clear the line
-        if i == 0:  # First status line gets a subtle background
-            sys.stdout.write("\033[48;5;236m" + " " * cols + "\033[0m")  # Dark gray background
+    bg_line = sgr(48, 5, 236) + b" " * cols + SGR_RESET
+    frame += b"\033[%d;1H\033[K" % status_row + bg_line
+    if status_lines > 1:
+        frame += b"\033[%d;1H\033[K" % (status_row + 1)
 
-    sys.stdout.write(f"\033[1;1H")  # Return cursor to Claude's area
-    sys.stdout.flush()
+    frame += b"\033[1;1H"  # Return cursor to Claude's area
+    frame += banner
+    write_all(sys.stdout.fileno(), [frame])
 
 
-def run_claude_with_pty(command, debug=False):
+def run_claude_with_pty(command, debug=False, banner=b""):
     """Run Claude in a PTY with startup message."""
-    sys.stderr.flush()
-
     # Track current message being typed and suggestions
-    current_message = ""
-    current_suggestion = ""
-    last_debug_info = ""
+    tracker = InputTracker(debug)
+    paint = None
+
+    # paint is looked up per call, so a painter rebuilt on resize is picked up
+    repaints = RepaintScheduler(
+        lambda force: paint(tracker.suggestion, tracker.debug_info, force=force)
+    )
+
+    # Input the PTY hasn't accepted yet - master_fd is non-blocking for the reads
+    pending_input = bytearray()
 
-    def update_and_store_status(suggestion="", debug_info=""):
-        """Update status line and store values for re-injection."""
-        nonlocal last_debug_info
-        last_debug_info = debug_info
-        update_status_line(suggestion=suggestion, debug_info=debug_info)
+    def send_to_claude(data):
+        """Queue bytes for Claude, writing what the PTY accepts right away."""
+        # If input is already queued we're waiting on EVENT_WRITE - just keep the order
+        waiting = bool(pending_input)
+        pending_input.extend(data)
+        if not waiting and not write_pending(master_fd, pending_input):
+            sel.modify(master_fd, selectors.EVENT_READ | selectors.EVENT_WRITE, "pty")
 
     # Create a pseudo-terminal and run the command
     pid, master_fd = pty.fork()
@@ -133,87 +430,122 @@ def run_claude_with_pty(command, debug=False):
         os.execvp("claude", command)
 
     # Parent process - set up terminal and copy data
+    # Seed the size cache even without a tty - SIGWINCH keeps it current after this
+    refresh_terminal_size()
+
+    def on_winch(signum, frame):
+        """SIGWINCH handler - re-query the size and rebuild the painter for it."""
+        nonlocal paint
+        refresh_terminal_size()
+        suggestion_segment.cache_clear()
+        paint = make_painter(debug, *get_terminal_size())
+        repaints.pending = True
+
     old_tty = None
-    if sys.stdin.isatty():
-        old_tty = termios.tcgetattr(sys.stdin)
-        setup_terminal_with_status(debug)
-        tty.setraw(sys.stdin.fileno())
-        # Initial status message
+    sel = None
+    wakeup_r = wakeup_w = None
+    old_wakeup_fd = None
+    old_winch = None
 
     try:
+        # Everything that can fail is set up before the terminal goes raw, and
+        # the finally below only undoes the parts that were actually done
+
+        # The event loop works on raw fds only, no file object lookups per wakeup
+        stdin_fd = sys.stdin.fileno()
+        stdout_fd = sys.stdout.fileno()
+
+        # Non-blocking so Claude's output can be drained in one go per wakeup
+        os.set_blocking(master_fd, False)
+
+        # Register both fds once instead of rebuilding an fd set per wakeup
+        sel = open_selector(stdin_fd)
+        sel.register(master_fd, selectors.EVENT_READ, "pty")
+
+        paint = make_painter(debug, *get_terminal_size())
+
+        # Only re-query the terminal size when it actually changes. The wakeup pipe
+        # makes a select() blocked without timeout return so the repaint isn't held
+        # back until the next keystroke
+        wakeup_r, wakeup_w = os.pipe()
+        os.set_blocking(wakeup_r, False)
+        os.set_blocking(wakeup_w, False)
+        sel.register(wakeup_r, selectors.EVENT_READ, "winch")
+        old_wakeup_fd = signal.set_wakeup_fd(wakeup_w)
+        old_winch = signal.signal(signal.SIGWINCH, on_winch)
+
+        if sys.stdin.isatty():
+            old_tty = termios.tcgetattr(sys.stdin)
+            # Startup message goes out with the terminal setup in a single write
+            setup_terminal_with_status(debug, banner)
+            tty.setraw(stdin_fd)
+        elif banner:
+            write_all(stdout_fd, [banner])
+
         while True:
-            r, w, e = select.select([sys.stdin, master_fd], [], [])
-
-            if sys.stdin in r:
-                data = os.read(sys.stdin.fileno(), 1024)
-
-                # Track input and handle suggestions
-                for byte in data:
-                    char = chr(byte) if byte < 128 else '?'
-
-                    if byte == 9:  # Tab key - accept suggestion
-                        if current_suggestion:
-                            # Inject suggestion as real keystrokes
-                            os.write(master_fd, current_suggestion.encode())
-                            current_message += current_suggestion
-                            debug_info = f"Accepted suggestion, new text: '{current_message}'" if debug else ""
-                            update_and_store_status(debug_info=debug_info)
-                            current_suggestion = ""
-                            continue  # Don't forward the Tab key itself
-
-                    if byte == 13:  # Enter key (carriage return)
-                        debug_info = f"Message sent: '{current_message}'" if debug else ""
-                        update_and_store_status(debug_info=debug_info)
-                        current_message = ""
-                        current_suggestion = ""
-                    elif byte == 127:  # Backspace
-                        if current_message:
-                            current_message = current_message[:-1]
-                        # Clear old suggestion since user is editing
-                        current_suggestion = ""
-                        debug_info = f"Current: '{current_message}' (suggestion voided)" if debug else ""
-                        update_and_store_status(debug_info=debug_info)
-                    elif byte == 3:  # Ctrl+C
-                        debug_info = "Ctrl+C pressed" if debug else ""
-                        update_and_store_status(debug_info=debug_info)
-                        current_message = ""
-                        current_suggestion = ""
-                    elif 32 <= byte <= 126:  # Printable ASCII
-                        current_message += char
-                        # Generate suggestion for the current text
-                        current_suggestion = generate_suggestion(current_message)
-                        debug_info = ""
-                        if debug:
-                            debug_info = f"Current: '{current_message}' | Suggestion: '{current_suggestion}'"
-                        update_and_store_status(suggestion=current_suggestion, debug_info=debug_info)
-
-                # Forward the data to Claude (unless it was Tab)
-                if not (len(data) == 1 and data[0] == 9):  # Don't forward Tab
-                    os.write(master_fd, data)
-
-                # Suggestion display will be handled by status line (to be implemented)
-
-            if master_fd in r:
-                data = os.read(master_fd, 1024)
+            # Wake up in time to flush a deferred repaint
+            events = sel.select(repaints.timeout())
+
+            if not events:
+                repaints.request()
+                continue
+
+            ready = {key.data for key, mask in events if mask & selectors.EVENT_READ}
+            if any(mask & selectors.EVENT_WRITE for _, mask in events):
+                if write_pending(master_fd, pending_input):
+                    sel.modify(master_fd, selectors.EVENT_READ, "pty")
+
+            if "winch" in ready:
+                os.read(wakeup_r, 512)  # Discard the signal numbers
+                repaints.request()
+
+            if "in" in ready:
+                data = os.read(stdin_fd, 4096)
+
                 if not data:
+                    # Redirected stdin hit EOF - stop polling it, keep relaying Claude
+                    sel.unregister(stdin_fd)
+                else:
+                    # Repaint at most once per read
+                    to_claude, status_changed = tracker.feed(data)
+                    if status_changed:
+                        repaints.request()
+                    if to_claude:
+                        send_to_claude(to_claude)
+
+            if "pty" in ready:
+                chunks = read_available(master_fd)
+                if not chunks:
                     break
 
                 # Write Claude's output first - don't interfere with it
-                os.write(sys.stdout.fileno(), data)
-                sys.stdout.flush()
+                write_all(stdout_fd, chunks)
 
-                # Always re-inject our status line after any Claude output
-                # This ensures we don't miss any of Claude's drawing
-                update_status_line(
-                    suggestion=current_suggestion,
-                    debug_info=last_debug_info if debug else ""
-                )
+                # Re-inject our status line after Claude output. Plain text only
+                # scrolls Claude's region, but escape sequences can move the cursor
+                # or clear the screen, so then the frame has to be redrawn as-is
+                repaints.request(clobbered=any(b"\033" in chunk for chunk in chunks))
 
-    except (OSError, KeyboardInterrupt):
+    except KeyboardInterrupt:
         pass
+    except Exception as e:
+        # EIO is how the PTY reports that Claude has exited - anything else is a
+        # real failure, and Claude must not be left running on a PTY nobody reads
+        if not (isinstance(e, OSError) and e.errno == errno.EIO):
+            hang_up_child(pid)
+            raise
     finally:
         if old_tty:
             termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_tty)
+        if old_winch is not None:
+            signal.signal(signal.SIGWINCH, old_winch)
+        if old_wakeup_fd is not None:
+            signal.set_wakeup_fd(old_wakeup_fd)
+        if wakeup_r is not None:
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+        if sel is not None:
+            sel.close()
 
     # Wait for child to exit
     _, status = os.waitpid(pid, 0)
@@ -239,12 +571,12 @@ def main():
     # Build command for Claude (without our wrapper flags)
     command = ["claude"] + remaining
 
-    print("Starting Claude Code with autocomplete!")
+    banner = b"Starting Claude Code with autocomplete!\n"
     if args.debug:
-        print("Debug mode enabled")
+        banner += b"Debug mode enabled\n"
 
     try:
-        exit_code = run_claude_with_pty(command, debug=args.debug)
+        exit_code = run_claude_with_pty(command, debug=args.debug, banner=banner)
         sys.exit(exit_code)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -0,0 +1,431 @@
+"""Tests for the Claude Code PTY wrapper."""
+
+import errno
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from claude_wrapper import wrapper
+from claude_wrapper.wrapper import (
+    MAX_DRAIN_CHUNKS,
+    REPAINT_INTERVAL,
+    SGR_RESET,
+    SUGGESTIONS,
+    InputTracker,
+    RepaintScheduler,
+    hang_up_child,
+    last_word,
+    make_painter,
+    read_available,
+    setup_terminal_with_status,
+    suggestion_segment,
+    write_all,
+    write_pending,
+)
+
+
+def fake_reads(monkeypatch, results):
+    """Make os.read return (or raise) each of results in turn."""
+    results = iter(results)
+
+    def read(fd, size):
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(wrapper.os, "read", read)
+
+
+def run_wrapper(tmp_path, claude_script, stdin):
+    """Run the wrapper with a fake claude on PATH and the given (non-tty) stdin."""
+    claude = tmp_path / "claude"
+    claude.write_text("#!/bin/sh\n" + claude_script + "\n")
+    claude.chmod(0o755)
+    env = dict(os.environ, PATH=f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run(
+        [sys.executable, "-c", "from claude_wrapper.wrapper import main; main()"],
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        timeout=20,
+    )
+
+
+def capture_writes(monkeypatch):
+    """Record each os.writev call as the bytes it would have written."""
+    writes = []
+
+    def writev(fd, buffers):
+        data = b"".join(bytes(b) for b in buffers)
+        writes.append(data)
+        return len(data)
+
+    monkeypatch.setattr(wrapper.os, "writev", writev)
+    return writes
+
+
+def fake_claude(tmp_path, monkeypatch, claude_script):
+    """Put a fake claude on PATH for run_claude_with_pty in this process."""
+    claude = tmp_path / "claude"
+    claude.write_text("#!/bin/sh\n" + claude_script + "\n")
+    claude.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def spawn_sleeper(setup=""):
+    """Start a long sleep as a bare child process, return its pid once setup ran."""
+    r, w = os.pipe()
+    try:
+        pid = os.posix_spawn(
+            "/bin/sh",
+            ["sh", "-c", setup + " echo ready >&3; exec sleep 30 3>&-"],
+            os.environ,
+            file_actions=[(os.POSIX_SPAWN_DUP2, w, 3)],
+        )
+        os.close(w)
+        w = None
+        assert os.read(r, 16) == b"ready\n"
+        return pid
+    finally:
+        os.close(r)
+        if w is not None:
+            os.close(w)
+
+
+def test_stdin_redirected_from_a_file(tmp_path):
+    input_file = tmp_path / "input.txt"
+    input_file.write_bytes(b"hello\n")
+    with open(input_file, "rb") as stdin:
+        result = run_wrapper(tmp_path, "exec head -n 1", stdin)
+    assert result.returncode == 0, result.stderr
+    assert b"hello" in result.stdout
+
+
+def test_stdin_at_eof_does_not_spin(tmp_path):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with open(os.devnull, "rb") as stdin:
+        result = run_wrapper(tmp_path, "echo from-claude; sleep 1", stdin)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    assert result.returncode == 0, result.stderr
+    assert b"from-claude" in result.stdout
+    # A loop busy-polling /dev/null would burn the whole second of CPU
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    assert cpu < 0.5
+
+
+def test_mixed_run_with_controls():
+    tracker = InputTracker()
+    data = b"fix it\rhelp"
+    assert tracker.feed(data) == (data, True)
+    assert tracker.message == b"help"
+    assert tracker.suggestion == SUGGESTIONS[b"help"]
+
+
+def test_ctrl_c_discards_message_mid_read():
+    tracker = InputTracker()
+    tracker.feed(b"explain\x03sho")
+    assert tracker.message == b"sho"
+    assert tracker.suggestion == b""
+    tracker.feed(b"W")
+    assert tracker.suggestion == SUGGESTIONS[b"show"]
+
+
+def test_non_printable_bytes_are_not_tracked():
+    tracker = InputTracker()
+    tracker.feed(b"wr\x00i\xc3te")
+    assert tracker.message == b"write"
+    assert tracker.suggestion == SUGGESTIONS[b"write"]
+
+
+def test_backspace_across_a_space():
+    tracker = InputTracker()
+    tracker.feed(b"help ")
+    assert tracker.current_word == b""
+    assert tracker.suggestion == b""
+
+    tracker.feed(b"\x7f")
+    assert tracker.message == b"help"
+    assert tracker.current_word == b"help"
+    assert tracker.suggestion == b""  # Voided while editing
+
+    tracker.feed(b"\x7fp")
+    assert tracker.message == b"help"
+    assert tracker.suggestion == SUGGESTIONS[b"help"]
+
+
+def test_backspace_on_empty_message():
+    tracker = InputTracker()
+    assert tracker.feed(b"\x7f") == (b"\x7f", True)
+    assert tracker.message == b""
+
+
+def test_tab_accepts_suggestion():
+    tracker = InputTracker()
+    tracker.feed(b"Write")
+    to_claude, changed = tracker.feed(b"\t")
+    assert to_claude == SUGGESTIONS[b"write"]  # The Tab itself isn't forwarded
+    assert changed
+    assert tracker.message == b"Write" + SUGGESTIONS[b"write"]
+    assert tracker.current_word == b"fibonacci"
+    assert tracker.suggestion == b""
+
+
+def test_tab_without_suggestion_is_swallowed():
+    tracker = InputTracker()
+    tracker.feed(b"hello")
+    assert tracker.feed(b"\t") == (b"", False)
+
+
+def test_debug_info_only_in_debug_mode():
+    tracker = InputTracker(debug=True)
+    tracker.feed(b"fix")
+    assert tracker.debug_info == "Current: 'fix' | Suggestion: ' the bug in this function'"
+    tracker.feed(b"\r")
+    assert tracker.debug_info == "Message sent: 'fix'"
+
+    tracker = InputTracker()
+    tracker.feed(b"fix\r")
+    assert tracker.debug_info == ""
+
+
+def test_last_word():
+    assert last_word(bytearray(b"please WRITE")) == b"write"
+    assert last_word(b"help ") == b""
+    assert last_word(b"") == b""
+
+
+def test_suggestion_segment():
+    assert suggestion_segment(b"", 80) == b""
+
+    suggestion = SUGGESTIONS[b"fix"]
+    segment = suggestion_segment(suggestion, 80)
+    assert suggestion in segment
+    assert segment.endswith(b" " * (80 - len(suggestion) - 10) + SGR_RESET)
+
+    # Narrower than the suggestion itself - no negative fill
+    assert suggestion_segment(suggestion, 5).endswith(b"\xe2\xae\x80" + SGR_RESET)
+
+
+def test_painter_skips_unchanged_suggestion(monkeypatch):
+    writes = capture_writes(monkeypatch)
+    paint = make_painter(False, 24, 80)
+    paint(SUGGESTIONS[b"fix"])
+    paint(SUGGESTIONS[b"fix"])
+    assert len(writes) == 1
+    assert suggestion_segment(SUGGESTIONS[b"fix"], 80) in writes[0]
+
+    paint(SUGGESTIONS[b"fix"], force=True)
+    assert len(writes) == 2
+    assert writes[1] == writes[0]
+
+    paint(b"")
+    assert len(writes) == 3
+
+
+def test_debug_painter_skips_unchanged_frame(monkeypatch):
+    writes = capture_writes(monkeypatch)
+    paint = make_painter(True, 24, 80)
+    paint(b"", "Message sent: 'fix'")
+    paint(b"", "Message sent: 'fix'")
+    assert len(writes) == 1
+
+    # Same suggestion but new debug info is a change
+    paint(b"", "Message sent: 'help'")
+    assert len(writes) == 2
+    paint(b"", "Message sent: 'help'", force=True)
+    assert writes[2] == writes[1]
+
+
+def test_clobbered_repaint_is_forced_when_deferred(monkeypatch):
+    writes = capture_writes(monkeypatch)
+    paint = make_painter(False, 24, 80)
+    now = [100.0]
+    repaints = RepaintScheduler(
+        lambda force: paint(SUGGESTIONS[b"fix"], force=force), clock=lambda: now[0]
+    )
+    assert repaints.timeout() is None
+
+    repaints.request()
+    assert len(writes) == 1
+
+    # Claude drew over the status line inside the debounce window
+    now[0] = 100.005
+    repaints.request(clobbered=True)
+    assert len(writes) == 1
+    assert repaints.timeout() == pytest.approx(REPAINT_INTERVAL - 0.005)
+
+    # The deferred repaint redraws the unchanged suggestion anyway
+    now[0] = 100.02
+    repaints.request()
+    assert len(writes) == 2
+    assert writes[1] == writes[0]
+    assert repaints.timeout() is None
+
+    # Without a clobber an unchanged suggestion is still skipped
+    now[0] = 100.04
+    repaints.request()
+    assert len(writes) == 2
+
+
+BANNER = b"Starting Claude Code with autocomplete!\n"
+
+# What the original wrapper wrote for a 10x60 terminal, one sys.stdout.write at a time
+BASELINE_SETUP = {
+    False: [
+        b"\033[1;9r", b"\033[1;1H", b"\033[0J",
+        b"\033[10;1H", b"\033[K", b"\033[48;5;236m" + b" " * 60 + b"\033[0m",
+        b"\033[1;1H",
+    ],
+    True: [
+        b"\033[1;8r", b"\033[1;1H", b"\033[0J",
+        b"\033[9;1H", b"\033[K", b"\033[48;5;236m" + b" " * 60 + b"\033[0m",
+        b"\033[10;1H", b"\033[K",
+        b"\033[1;1H",
+    ],
+}
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_setup_frame_matches_baseline(monkeypatch, tmp_path, debug):
+    writes = capture_writes(monkeypatch)
+    monkeypatch.setattr(wrapper, "_term_size", [10, 60])
+    banner = BANNER + (b"Debug mode enabled\n" if debug else b"")
+    with open(tmp_path / "out", "wb") as stdout:
+        monkeypatch.setattr(sys, "stdout", stdout)
+        setup_terminal_with_status(debug, banner)
+    # One write, with the banner after the frame so the clear doesn't wipe it
+    assert writes == [b"".join(BASELINE_SETUP[debug]) + banner]
+
+
+def test_read_available_stops_when_drained(monkeypatch):
+    fake_reads(monkeypatch, [b"a", b"b", BlockingIOError()])
+    assert read_available(0) == [b"a", b"b"]
+
+
+def test_read_available_eof(monkeypatch):
+    fake_reads(monkeypatch, [b""])
+    assert read_available(0) == []
+
+
+def test_read_available_eio_partway_returns_what_was_read(monkeypatch):
+    fake_reads(monkeypatch, [b"a", b"b", OSError(errno.EIO, "Input/output error")])
+    assert read_available(0) == [b"a", b"b"]
+
+
+def test_read_available_eio_first_raises(monkeypatch):
+    fake_reads(monkeypatch, [OSError(errno.EIO, "Input/output error")])
+    with pytest.raises(OSError):
+        read_available(0)
+
+
+def test_read_available_is_bounded(monkeypatch):
+    monkeypatch.setattr(wrapper.os, "read", lambda fd, size: b"x")
+    assert len(read_available(0)) == MAX_DRAIN_CHUNKS
+    assert MAX_DRAIN_CHUNKS < os.sysconf("SC_IOV_MAX")
+
+
+def test_write_all_resumes_short_writes(monkeypatch):
+    written = []
+
+    def writev(fd, buffers):
+        # Accept at most 3 bytes per call, like an interrupted tty write
+        data = b"".join(bytes(b) for b in buffers)[:3]
+        written.append(data)
+        return len(data)
+
+    monkeypatch.setattr(wrapper.os, "writev", writev)
+    write_all(1, [b"ab", b"", b"cdefg", bytearray(b"hi")])
+    assert b"".join(written) == b"abcdefghi"
+
+
+def test_write_pending_queues_what_a_full_fd_rejects():
+    r, w = os.pipe()
+    os.set_blocking(w, False)
+    data = bytes(range(256)) * 4096  # 1 MiB, more than any pipe buffer holds
+    pending = bytearray(data)
+    try:
+        assert not write_pending(w, pending)
+        assert 0 < len(pending) < len(data)
+
+        # As the reader catches up the rest goes out, in order
+        received = bytearray()
+        while not write_pending(w, pending):
+            received += os.read(r, 65536)
+        os.close(w)
+        w = None
+        while True:
+            chunk = os.read(r, 65536)
+            if not chunk:
+                break
+            received += chunk
+        assert received == data
+    finally:
+        os.close(r)
+        if w is not None:
+            os.close(w)
+
+
+def test_write_pending_with_nothing_queued():
+    r, w = os.pipe()
+    try:
+        assert write_pending(w, bytearray())
+    finally:
+        os.close(r)
+        os.close(w)
+
+
+def test_hang_up_child_sends_sighup_first():
+    pid = spawn_sleeper()
+    start = time.monotonic()
+    status = hang_up_child(pid)
+    assert os.WIFSIGNALED(status)
+    assert os.WTERMSIG(status) == signal.SIGHUP
+    assert time.monotonic() - start < 1
+
+
+def test_hang_up_child_escalates_when_ignored():
+    pid = spawn_sleeper("trap '' HUP TERM;")
+    status = hang_up_child(pid, grace=0.1)
+    assert os.WIFSIGNALED(status)
+    assert os.WTERMSIG(status) == signal.SIGKILL
+
+
+def test_failed_setup_hangs_up_claude(tmp_path, monkeypatch):
+    fake_claude(tmp_path, monkeypatch, "exec sleep 30")
+    forked = []
+    real_fork = wrapper.pty.fork
+
+    def fork():
+        pid, master_fd = real_fork()
+        if pid:
+            forked.append(pid)
+        return pid, master_fd
+
+    monkeypatch.setattr(wrapper.pty, "fork", fork)
+    errors = []
+
+    def run():
+        # set_wakeup_fd only works on the main thread, so setup fails here
+        with open(os.devnull, "rb") as stdin, open(tmp_path / "out", "wb") as stdout:
+            monkeypatch.setattr(sys, "stdin", stdin)
+            monkeypatch.setattr(sys, "stdout", stdout)
+            try:
+                wrapper.run_claude_with_pty(["claude"])
+            except ValueError as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(10)
+    assert errors
+    with pytest.raises(ChildProcessError):
+        os.waitpid(forked[0], os.WNOHANG)  # Already reaped